@@ -0,0 +1,153 @@
+"""Load generator for the TestSmith-AI API.
+
+Drives ``/build_kb``, ``/generate_test_cases`` and ``/generate_selenium_script``
+at a fixed concurrency and reports throughput, latency percentiles and error
+rates per endpoint. Run the API with ``LLM_PROVIDER=stub`` to measure the
+retrieval and request-handling layers without a Groq key:
+
+    LLM_PROVIDER=stub uvicorn backend.main:app --port 8000
+    python -m backend.loadtest --concurrency 32 --duration 60
+"""
+from __future__ import annotations
+import os
+import time
+import random
+import asyncio
+import argparse
+from typing import List, Dict, Tuple
+
+import httpx
+
+QUERIES = [
+    "Generate all positive and negative test cases for the discount code feature.",
+    "Generate positive and negative test cases for the discount code feature",
+    "Generate boundary test cases for cart quantity updates.",
+    "Generate test cases for the user details form validation.",
+    "Generate test cases for express vs standard shipping costs.",
+    "Generate test cases for PayPal and credit card payment methods.",
+]
+
+SAMPLE_TEST_CASE = {
+    "test_id": "TC-DISCOUNT-POS-001",
+    "feature": "Discount Code",
+    "scenario": "[Positive] Apply SAVE15 and verify 15% off the subtotal",
+    "steps": ["Add a product to the cart.", "Enter SAVE15 and apply it.", "Fill user details and click Pay Now."],
+    "expected_result": "Total reflects a 15% discount and 'Payment Successful!' is shown.",
+    "grounded_in": ["product_specs.md"],
+}
+
+ENDPOINTS = ("build_kb", "generate_test_cases", "generate_selenium_script")
+
+
+def _load_docs(docs_dir: str, html_path: str) -> List[Tuple[str, Tuple[str, bytes, str]]]:
+    files = []
+    for name in sorted(os.listdir(docs_dir)):
+        path = os.path.join(docs_dir, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                files.append(("support_docs", (name, f.read(), "application/octet-stream")))
+    if html_path and os.path.exists(html_path):
+        with open(html_path, "rb") as f:
+            files.append(("checkout_html", (os.path.basename(html_path), f.read(), "text/html")))
+    return files
+
+
+async def _call(client: httpx.AsyncClient, endpoint: str, files) -> None:
+    if endpoint == "build_kb":
+        r = await client.post("/build_kb", files=files)
+    elif endpoint == "generate_test_cases":
+        r = await client.post("/generate_test_cases", json={"query": random.choice(QUERIES)})
+    else:
+        r = await client.post("/generate_selenium_script", json={"test_case": SAMPLE_TEST_CASE})
+    r.raise_for_status()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, List]]:
+    files = _load_docs(args.docs_dir, args.html)
+    weights = [args.build_kb_weight, args.test_cases_weight, args.script_weight]
+    stats: Dict[str, Dict[str, List]] = {ep: {"latencies": [], "errors": []} for ep in ENDPOINTS}
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        if args.warmup:
+            await _call(client, "build_kb", files)
+
+        deadline = time.perf_counter() + args.duration
+        remaining = [args.requests]
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                if args.requests:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                endpoint = random.choices(ENDPOINTS, weights=weights)[0]
+                start = time.perf_counter()
+                try:
+                    await _call(client, endpoint, files)
+                except Exception as e:
+                    stats[endpoint]["errors"].append(type(e).__name__)
+                else:
+                    stats[endpoint]["latencies"].append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    _report(stats, elapsed, args.concurrency)
+    return stats
+
+
+def _report(stats: Dict[str, Dict[str, List]], elapsed: float, concurrency: int) -> None:
+    print(f"concurrency={concurrency} elapsed={elapsed:.1f}s")
+    header = f"{'endpoint':<26}{'ok':>7}{'err':>6}{'err%':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    total_ok = total_err = 0
+    for ep in ENDPOINTS:
+        lat = sorted(stats[ep]["latencies"])
+        errs = stats[ep]["errors"]
+        n = len(lat) + len(errs)
+        if not n:
+            continue
+        total_ok += len(lat)
+        total_err += len(errs)
+        ms = [v * 1000.0 for v in (_percentile(lat, 50), _percentile(lat, 95), _percentile(lat, 99), lat[-1] if lat else 0.0)]
+        print(
+            f"{ep:<26}{len(lat):>7}{len(errs):>6}{100.0 * len(errs) / n:>6.1f}%{len(lat) / elapsed:>9.1f}"
+            + "".join(f"{v:>9.0f}" for v in ms)
+        )
+        if errs:
+            kinds = {k: errs.count(k) for k in sorted(set(errs))}
+            print(f"{'':<26}errors: {kinds}")
+    total = total_ok + total_err
+    if total:
+        print(f"{'total':<26}{total_ok:>7}{total_err:>6}{100.0 * total_err / total:>6.1f}%{total_ok / elapsed:>9.1f}")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Load-test the TestSmith-AI API.")
+    p.add_argument("--base-url", default=os.getenv("API_BASE", "http://127.0.0.1:8000"))
+    p.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight requests")
+    p.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    p.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only)")
+    p.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    p.add_argument("--docs-dir", default="docs", help="Support documents uploaded by /build_kb calls")
+    p.add_argument("--html", default=os.path.join("assets", "checkout.html"))
+    p.add_argument("--build-kb-weight", type=float, default=1.0)
+    p.add_argument("--test-cases-weight", type=float, default=6.0)
+    p.add_argument("--script-weight", type=float, default=3.0)
+    p.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip the initial /build_kb call")
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
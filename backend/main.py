@@ -1,22 +1,40 @@
 import os
 import io
 import json
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import FileResponse
 from dotenv import load_dotenv
 
-from backend.parser import parse_any
-from backend.rag import build_kb, retrieve_context, persist_runtime_html, load_runtime_html, RUNTIME_HTML_PATH
+from backend.parser import parse_any, parse_records, shutdown_pdf_pool
+from backend.rag import (
+    build_kb,
+    delete_document,
+    list_documents,
+    retrieve_context,
+    persist_runtime_html,
+    load_runtime_html,
+    RUNTIME_HTML_PATH,
+)
 from backend.llm import LLMClient
 
 # Load environment variables from .env if present
 load_dotenv()
 
-app = FastAPI(title="TestSmith-AI API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop PDF parsing workers started on demand by parse_records
+    shutdown_pdf_pool()
+
+
+app = FastAPI(title="TestSmith-AI API", version="0.1.0", lifespan=lifespan)
 # Serve static assets (sample checkout.html)
 app.mount("/static", StaticFiles(directory="assets"), name="static")
 
@@ -33,6 +51,17 @@ class BuildKBResponse(BaseModel):
     chunks_indexed: int
     sources: List[str]
 
+class KBDocument(BaseModel):
+    source: str
+    chunks: int
+
+class ListDocumentsResponse(BaseModel):
+    documents: List[KBDocument]
+
+class DeleteDocumentResponse(BaseModel):
+    source: str
+    chunks_deleted: int
+
 class GenerateTestCasesRequest(BaseModel):
     query: str
 
@@ -87,15 +116,17 @@ async def build_kb_endpoint(
     # Support documents
     for uf in support_docs:
         content = await uf.read()
-        text, meta = parse_any(content, filename=uf.filename)
-        texts.append({"text": text, "metadata": meta})
-        sources.append(meta.get("source_document", uf.filename))
+        # One record per PDF page / Markdown section keeps chunks tightly scoped
+        records = await run_in_threadpool(parse_records, content, uf.filename)
+        for text, meta in records:
+            texts.append({"text": text, "metadata": meta})
+        sources.append(uf.filename)
 
     # checkout.html as file or pasted text
     html_text = None
     if checkout_html is not None:
         b = await checkout_html.read()
-        html_text, meta = parse_any(b, filename=checkout_html.filename)
+        html_text, meta = await run_in_threadpool(parse_any, b, checkout_html.filename)
         texts.append({"text": html_text, "metadata": meta})
         sources.append(meta.get("source_document", checkout_html.filename))
     elif checkout_html_text:
@@ -107,10 +138,26 @@ async def build_kb_endpoint(
     if html_text:
         persist_runtime_html(html_text)
 
-    chunks_indexed = build_kb(texts)
+    # Pass every uploaded name so a re-upload that yields no text (e.g. an
+    # image-only PDF) still replaces the previous version
+    chunks_indexed = build_kb(texts, sources=sources)
     return BuildKBResponse(chunks_indexed=chunks_indexed, sources=sorted(list(set(sources))))
 
 
+@app.get("/kb/documents", response_model=ListDocumentsResponse)
+def list_documents_endpoint():
+    docs = [KBDocument(source=src, chunks=n) for src, n in sorted(list_documents().items())]
+    return ListDocumentsResponse(documents=docs)
+
+
+@app.delete("/kb/documents/{source:path}", response_model=DeleteDocumentResponse)
+def delete_document_endpoint(source: str):
+    deleted = delete_document(source)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No indexed chunks for source '{source}'")
+    return DeleteDocumentResponse(source=source, chunks_deleted=deleted)
+
+
 @app.post("/generate_test_cases", response_model=GenerateTestCasesResponse)
 async def generate_test_cases(req: GenerateTestCasesRequest):
     query = req.query
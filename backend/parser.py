@@ -1,6 +1,13 @@
 from __future__ import annotations
+import os
+import re
 import json
-from typing import Tuple
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional
 from bs4 import BeautifulSoup
 
 try:
@@ -8,41 +15,261 @@ try:
 except Exception:
     fitz = None
 
+DATA_DIR = os.path.join("data")
+PARSE_CACHE_DIR = os.path.join(DATA_DIR, "parse_cache")
+# Bump when record shapes change so stale cache entries are ignored.
+PARSE_CACHE_VERSION = 2
+
+# PDFs with at least this many pages are split across a process pool, one
+# contiguous page range per worker.
+PDF_PARALLEL_MIN_PAGES = 32
+PDF_WORKERS = max(1, min(8, os.cpu_count() or 1))
+
+os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+
+_MD_HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+_MD_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+Record = Tuple[str, dict]
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
 
 def parse_any(content: bytes, filename: str) -> Tuple[str, dict]:
+    """Parse a file into a single text blob (records joined back together)."""
+    records = parse_records(content, filename)
+    text = "\n".join(text for text, _ in records)
+    meta = dict(records[0][1]) if records else {"source_document": filename, "type": "text"}
+    meta.pop("page", None)
+    meta.pop("section", None)
+    return text, meta
+
+
+def parse_records(content: bytes, filename: str) -> List[Record]:
+    """Parse a file into per-page (PDF) or per-section (Markdown) records.
+
+    Results are cached on disk by content hash, so re-uploading an unchanged
+    file skips parsing entirely. The cache keeps the ``PARSE_CACHE_MAX_FILES``
+    (default 256) most recently used entries. ``source_document`` always
+    reflects ``filename``.
+    """
+    kind = _kind(filename)
+    digest = hashlib.sha256(content).hexdigest()
+    cache_path = os.path.join(PARSE_CACHE_DIR, f"{digest}-{kind}-v{PARSE_CACHE_VERSION}.json")
+    records = _read_cache(cache_path)
+    if records is None:
+        records, parsed = _parse(content, kind)
+        # Only cache real parses, never the raw-bytes fallback for a PDF.
+        if parsed:
+            _write_cache(cache_path, records)
+    return [(text, {"source_document": filename, **meta}) for text, meta in records]
+
+
+def _kind(filename: str) -> str:
     name = (filename or "").lower()
-    meta = {"source_document": filename}
+    if name.endswith(".md"):
+        return "md"
+    if name.endswith(".txt"):
+        return "txt"
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith((".html", ".htm")):
+        return "html"
+    return "other"
+
+
+def _read_cache(path: str) -> Optional[List[Record]]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = [(text, meta) for text, meta in json.load(f)]
+    except Exception:
+        return None
+    try:
+        os.utime(path)  # mark as recently used for pruning
+    except OSError:
+        pass
+    return records
+
+
+def _write_cache(path: str, records: List[Record]) -> None:
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception:
+        return
+    _prune_cache(int(os.getenv("PARSE_CACHE_MAX_FILES", "256")))
+
+
+def _prune_cache(max_files: int) -> None:
+    """Delete the least recently used cache entries beyond ``max_files``."""
+    entries = []
+    for name in os.listdir(PARSE_CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(PARSE_CACHE_DIR, name)
+        try:
+            entries.append((os.stat(path).st_mtime_ns, path))
+        except OSError:
+            continue
+    if len(entries) <= max_files:
+        return
+    entries.sort()
+    for _, path in entries[: len(entries) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _parse(content: bytes, kind: str) -> Tuple[List[Record], bool]:
+    """Return records without ``source_document`` and whether parsing succeeded.
 
-    if name.endswith((".md", ".txt")):
+    The flag is False when a PDF could not be read and the bytes were decoded
+    as text instead.
+    """
+    records = _parse_kind(content, kind)
+    if records is not None:
+        return records, True
+    # Fallback: treat as utf-8 text
+    return [(content.decode("utf-8", errors="ignore"), {"type": "text"})], kind != "pdf"
+
+
+def _parse_kind(content: bytes, kind: str) -> Optional[List[Record]]:
+    if kind == "md":
+        return _markdown_sections(content.decode("utf-8", errors="ignore"))
+
+    if kind == "txt":
         try:
-            return content.decode("utf-8", errors="ignore"), {**meta, "type": "text"}
+            return [(content.decode("utf-8", errors="ignore"), {"type": "text"})]
         except Exception:
-            return content.decode("latin-1", errors="ignore"), {**meta, "type": "text"}
+            return [(content.decode("latin-1", errors="ignore"), {"type": "text"})]
 
-    if name.endswith(".json"):
+    if kind == "json":
         try:
             data = json.loads(content.decode("utf-8", errors="ignore"))
             # pretty-print to keep structure
-            return json.dumps(data, indent=2), {**meta, "type": "json"}
+            return [(json.dumps(data, indent=2), {"type": "json"})]
         except Exception:
-            return content.decode("utf-8", errors="ignore"), {**meta, "type": "json"}
+            return [(content.decode("utf-8", errors="ignore"), {"type": "json"})]
 
-    if name.endswith(".pdf") and fitz is not None:
-        text = ""
+    if kind == "pdf":
+        if fitz is None:
+            return None
         try:
-            with fitz.open(stream=content, filetype="pdf") as doc:
-                for page in doc:
-                    text += page.get_text()
-            return text, {**meta, "type": "pdf"}
+            return [(text, {"type": "pdf", "page": page}) for page, text in _pdf_pages(content) if text.strip()]
         except Exception:
-            pass
+            return None
 
-    if name.endswith((".html", ".htm")):
+    if kind == "html":
         text = _html_to_text(content.decode("utf-8", errors="ignore"))
-        return text, {**meta, "type": "html"}
+        return [(text, {"type": "html"})]
 
-    # Fallback: treat as utf-8 text
-    return content.decode("utf-8", errors="ignore"), {**meta, "type": "text"}
+    return None
+
+
+def _markdown_sections(text: str) -> List[Record]:
+    """Split Markdown on headings; each section keeps its heading line.
+
+    Lines inside ``` or ~~~ fenced code blocks are never treated as headings.
+    """
+    records: List[Record] = []
+    lines: List[str] = []
+    heading = ""
+    fence = ""
+
+    def flush() -> None:
+        body = "\n".join(lines).strip()
+        if body:
+            meta = {"type": "text"}
+            if heading:
+                meta["section"] = heading
+            records.append((body, meta))
+
+    for line in text.splitlines():
+        f = _MD_FENCE_RE.match(line)
+        if fence:
+            # A closing fence uses the same character, is at least as long and has no info string
+            if f and f.group(1)[0] == fence[0] and len(f.group(1)) >= len(fence) and not line[f.end():].strip():
+                fence = ""
+            lines.append(line)
+            continue
+        if f:
+            fence = f.group(1)
+            lines.append(line)
+            continue
+        m = _MD_HEADING_RE.match(line)
+        if m:
+            flush()
+            lines = []
+            heading = m.group(1).strip()
+        lines.append(line)
+    flush()
+    return records or [(text, {"type": "text"})]
+
+
+def _pdf_page_range(source, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract pages [start, stop) as (1-based page number, text) pairs.
+
+    ``source`` is the PDF bytes in-process, or a file path in pool workers so
+    the document is not pickled into every task.
+    """
+    if isinstance(source, str):
+        doc = fitz.open(source)
+    else:
+        doc = fitz.open(stream=source, filetype="pdf")
+    with doc:
+        return [(i + 1, doc[i].get_text()) for i in range(start, stop)]
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: the server process already runs threads, so forking is unsafe
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF worker processes, if any were started."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(cancel_futures=True)
+            _pdf_pool = None
+
+
+def _pdf_pages(content: bytes) -> List[Tuple[int, str]]:
+    with fitz.open(stream=content, filetype="pdf") as doc:
+        n = doc.page_count
+    if n < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        return _pdf_page_range(content, 0, n)
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        per_worker = -(-n // PDF_WORKERS)
+        pool = _get_pdf_pool()
+        futures = [
+            pool.submit(_pdf_page_range, path, start, min(n, start + per_worker))
+            for start in range(0, n, per_worker)
+        ]
+        pages: List[Tuple[int, str]] = []
+        for fut in futures:
+            pages.extend(fut.result())
+        return pages
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
 def _html_to_text(html: str) -> str:
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet
+
+from backend.vector_store import _tokenize
+
+_Key = Tuple[FrozenSet[str], int]
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class QueryCache:
+    """Bounded LRU of retrieval results keyed by normalized query tokens.
+
+    Entries are tied to a KB generation; the whole cache is dropped as soon as
+    a lookup or store sees a newer generation. ``max_entries`` defaults to
+    ``RETRIEVAL_CACHE_SIZE``; ``jaccard`` defaults to ``RETRIEVAL_CACHE_JACCARD``,
+    the minimum token Jaccard similarity for reusing another query's results
+    (1.0 means only identical token sets hit the cache).
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, jaccard: Optional[float] = None) -> None:
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))
+        self.jaccard = jaccard if jaccard is not None else float(os.getenv("RETRIEVAL_CACHE_JACCARD", "1.0"))
+        self._entries: "OrderedDict[_Key, List[Dict[str, Any]]]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> FrozenSet[str]:
+        return frozenset(_tokenize(query))
+
+    def _sync(self, generation: int) -> None:
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, query: str, k: int, generation: int) -> Optional[List[Dict[str, Any]]]:
+        tokens = self.normalize(query)
+        with self._lock:
+            self._sync(generation)
+            key = (tokens, k)
+            hit = self._entries.get(key)
+            if hit is None and self.jaccard < 1.0:
+                best = 0.0
+                for (cached_tokens, cached_k), results in self._entries.items():
+                    if cached_k != k:
+                        continue
+                    score = _jaccard(tokens, cached_tokens)
+                    if score >= self.jaccard and score > best:
+                        best, key, hit = score, (cached_tokens, cached_k), results
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+            return [dict(d) for d in hit]
+
+    def put(self, query: str, k: int, generation: int, results: List[Dict[str, Any]]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._generation is not None and generation < self._generation:
+                return  # computed against a KB that has since changed
+            self._sync(generation)
+            key = (self.normalize(query), k)
+            self._entries[key] = [dict(d) for d in results]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
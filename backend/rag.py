@@ -1,14 +1,25 @@
 from __future__ import annotations
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 
-from backend.vector_store import add_documents, query as vs_query
+from backend.vector_store import add_documents, delete_source, kb_generation, list_sources, query as vs_query
+from backend.query_cache import QueryCache
 
 DATA_DIR = os.path.join("data")
 RUNTIME_HTML_PATH = os.path.join(DATA_DIR, "runtime_checkout.html")
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Built on first retrieval so settings loaded from .env after import apply.
+_query_cache: Optional[QueryCache] = None
+
+
+def _get_query_cache() -> QueryCache:
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryCache()
+    return _query_cache
+
 
 def chunk_text(text: str, chunk_size: int = 900, overlap: int = 150) -> List[str]:
     chunks = []
@@ -26,22 +37,46 @@ def chunk_text(text: str, chunk_size: int = 900, overlap: int = 150) -> List[str
     return chunks
 
 
-def build_kb(texts_with_meta: List[Dict[str, Any]]) -> int:
+def build_kb(texts_with_meta: List[Dict[str, Any]], replace: bool = True, sources: Iterable[str] = ()) -> int:
+    """Chunk and index documents.
+
+    With ``replace`` (the default) any chunks previously indexed for the same
+    ``source_document`` are removed, so re-uploading a file updates it in place.
+    ``sources`` names extra documents to replace even if they produced no text.
+    """
     to_add = []
+    sources = set(sources)
     for item in texts_with_meta:
         text = (item.get("text") or "").strip()
         meta = item.get("metadata") or {}
+        if meta.get("source_document"):
+            sources.add(meta["source_document"])
         if not text:
             continue
         for ch in chunk_text(text):
             to_add.append({"text": ch, "metadata": meta})
-    if not to_add:
+    if not to_add and not replace:
         return 0
-    return add_documents(to_add)
+    return add_documents(to_add, replace_sources=sources if replace else ())
+
+
+def delete_document(source: str) -> int:
+    return delete_source(source)
+
+
+def list_documents() -> Dict[str, int]:
+    return list_sources()
 
 
 def retrieve_context(query: str, k: int = 6) -> List[Dict[str, Any]]:
-    return vs_query(query=query, k=k)
+    cache = _get_query_cache()
+    generation = kb_generation()
+    cached = cache.get(query, k, generation)
+    if cached is not None:
+        return cached
+    results = vs_query(query=query, k=k)
+    cache.put(query, k, generation, results)
+    return results
 
 
 def persist_runtime_html(html: str) -> None:
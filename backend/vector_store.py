@@ -1,55 +1,624 @@
 from __future__ import annotations
 import os
-import uuid
 import json
+import logging
+import mmap
 import re
-from typing import List, Dict, Any
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 DATA_DIR = os.path.join("data")
-STORE_PATH = os.path.join(DATA_DIR, "kb_store.json")
+KB_DIR = os.path.join(DATA_DIR, "kb")
+TABLES_PATH = os.path.join(KB_DIR, "tables.json")
+LOCK_PATH = os.path.join(KB_DIR, ".lock")
+# Pre-segment store format; imported once on first load if still present.
+LEGACY_STORE_PATH = os.path.join(DATA_DIR, "kb_store.json")
+
+os.makedirs(KB_DIR, exist_ok=True)
 
-os.makedirs(DATA_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
 
 _TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SEGMENT_NAME_RE = re.compile(r"^seg-\d+\.bin(\.tmp)?$")
 
+# Segment file layout (native byte order, every array is uint32):
+#   header: magic, n_chunks, n_token_ids, n_posting_tokens
+#   chunk_ids[n] | source_ids[n] | meta_ids[n] | text_offsets[n+1] | token_offsets[n+1] | token_ids[m]
+#   posting_tokens[p] | posting_offsets[p+1] | posting_rows[m]
+#   text: one contiguous UTF-8 buffer addressed by text_offsets
+_SEGMENT_MAGIC = b"TSKBSEG3"
+_HEADER = struct.Struct("<8sIII")
+_U32 = "I"
+_U32_MAX = 2**32 - 1
 
-def _load_store() -> Dict[str, Any]:
-    if os.path.exists(STORE_PATH):
-        try:
-            with open(STORE_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {"docs": []}
+# Background compaction kicks in once this share of stored chunks is deleted,
+# or once uploads have produced this many segments.
+COMPACT_DEAD_RATIO = 0.3
+COMPACT_MAX_SEGMENTS = 16
 
+# Guards the module-level store; queries hold it while scoring so compaction
+# never unmaps a segment that is being read.
+_lock = threading.RLock()
+_compacting = False
 
-def _save_store(store: Dict[str, Any]) -> None:
-    with open(STORE_PATH, "w", encoding="utf-8") as f:
-        json.dump(store, f, ensure_ascii=False)
+# Bumped whenever the indexed corpus may have changed (writes, compaction,
+# reloads) so callers can key caches on it.
+_generation = 0
 
 
 def _tokenize(text: str) -> List[str]:
     return _TOKEN_RE.findall(text.lower())
 
 
-def add_documents(docs: List[Dict[str, Any]]) -> int:
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning("Could not remove %s: %s", path, e)
+
+
+def _os_lock(fh) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return
+    fh.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK gives up after ~10s; keep waiting
+
+
+def _os_unlock(fh) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _WriterLock:
+    """Reentrant lock shared by every process using ``KB_DIR``.
+
+    All writes (appends, tombstones, compaction) hold it, so segment names,
+    chunk ids and interned tables are always allocated from the latest tables
+    on disk. Readers never take it. Lock order is writer lock, then ``_lock``.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def __enter__(self) -> "_WriterLock":
+        self._local.acquire()
+        if self._depth == 0:
+            try:
+                fh = open(LOCK_PATH, "a+b")
+                try:
+                    _os_lock(fh)
+                except BaseException:
+                    fh.close()
+                    raise
+            except BaseException:
+                self._local.release()
+                raise
+            self._fh = fh
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _os_unlock(self._fh)
+            finally:
+                self._fh.close()
+                self._fh = None
+        self._local.release()
+
+
+_writer_lock = _WriterLock()
+
+
+def _tables_stamp() -> Optional[Tuple[int, int, int]]:
+    # os.replace gives every save a new inode, so this changes even when two
+    # saves land within the filesystem's mtime resolution.
+    try:
+        st = os.stat(TABLES_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _meta_key(meta: Dict[str, Any]) -> str:
+    return json.dumps(meta, sort_keys=True, ensure_ascii=False)
+
+
+class _Segment:
+    """An immutable batch of chunks, memory-mapped from a single file.
+
+    Chunk text is decoded lazily from the mapped buffer, so resident memory is
+    only the pages the OS actually keeps hot. ``source_rows`` indexes rows by
+    source id. Deletions are recorded as
+    tombstoned rows in ``dead`` until compaction rewrites the segment.
+    """
+
+    def __init__(self, name: str, path: str, dead: Iterable[int] = ()) -> None:
+        self.name = name
+        self.path = path
+        self.dead = set(dead)
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, m, p = _HEADER.unpack_from(self._mm, 0)
+        if magic != _SEGMENT_MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a KB segment: {path}")
+        self.size = n
+        self._views: List[memoryview] = []
+        self._pos = _HEADER.size
+        self.chunk_ids = self._take(n)
+        self.source_ids = self._take(n)
+        self.meta_ids = self._take(n)
+        self.text_offsets = self._take(n + 1)
+        self.token_offsets = self._take(n + 1)
+        self.token_ids = self._take(m)
+        self.posting_tokens = self._take(p)
+        self.posting_offsets = self._take(p + 1)
+        self.posting_rows = self._take(m)
+        self._text = self._slice(self._pos, len(self._mm))
+        # source_id -> rows, so deletes only visit segments holding that source
+        self.source_rows: Dict[int, array] = {}
+        for row, sid in enumerate(self.source_ids):
+            self.source_rows.setdefault(sid, array(_U32)).append(row)
+
+    def _slice(self, start: int, end: int) -> memoryview:
+        view = memoryview(self._mm)[start:end]
+        self._views.append(view)
+        return view
+
+    def _take(self, count: int) -> memoryview:
+        nbytes = count * array(_U32).itemsize
+        view = self._slice(self._pos, self._pos + nbytes).cast(_U32)
+        self._views.append(view)
+        self._pos += nbytes
+        return view
+
+    def text(self, row: int) -> str:
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def text_bytes(self, row: int) -> bytes:
+        return bytes(self._text[self.text_offsets[row] : self.text_offsets[row + 1]])
+
+    def tokens(self, row: int) -> memoryview:
+        return self.token_ids[self.token_offsets[row] : self.token_offsets[row + 1]]
+
+    def postings(self, token_id: int) -> memoryview:
+        """Rows containing ``token_id`` (tombstoned rows included)."""
+        i = bisect_left(self.posting_tokens, token_id)
+        if i == len(self.posting_tokens) or self.posting_tokens[i] != token_id:
+            return self.posting_rows[0:0]
+        return self.posting_rows[self.posting_offsets[i] : self.posting_offsets[i + 1]]
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    @staticmethod
+    def write(path: str, rows: List[Tuple[int, int, int, bytes, array]]) -> None:
+        """Write (chunk_id, source_id, meta_id, utf8_text, unique_token_ids) rows to a segment file."""
+        chunk_ids, source_ids, meta_ids = array(_U32), array(_U32), array(_U32)
+        text_offsets, token_offsets = array(_U32, [0]), array(_U32, [0])
+        token_ids = array(_U32)
+        postings: Dict[int, array] = {}
+        text_len = 0
+        for row, (chunk_id, source_id, meta_id, text, toks) in enumerate(rows):
+            chunk_ids.append(chunk_id)
+            source_ids.append(source_id)
+            meta_ids.append(meta_id)
+            text_len += len(text)
+            if text_len > _U32_MAX:
+                raise ValueError("Segment text exceeds 4 GiB; split the batch")
+            text_offsets.append(text_len)
+            token_ids.extend(toks)
+            token_offsets.append(len(token_ids))
+            for t in toks:
+                postings.setdefault(t, array(_U32)).append(row)
+        posting_tokens = array(_U32, sorted(postings))
+        posting_offsets, posting_rows = array(_U32, [0]), array(_U32)
+        for t in posting_tokens:
+            posting_rows.extend(postings[t])
+            posting_offsets.append(len(posting_rows))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_SEGMENT_MAGIC, len(rows), len(token_ids), len(posting_tokens)))
+            for arr in (
+                chunk_ids, source_ids, meta_ids, text_offsets, token_offsets, token_ids,
+                posting_tokens, posting_offsets, posting_rows,
+            ):
+                f.write(arr.tobytes())
+            for _, _, _, text, _ in rows:
+                f.write(text)
+        os.replace(tmp, path)
+
+
+class _Store:
+    """Interned lookup tables plus the list of mapped segments.
+
+    Sources, metadata dicts and tokens are each stored once and referenced from
+    segments by small integer ids. ``source_counts`` tracks live chunks per
+    source and is kept up to date on every append and delete.
+    """
+
+    def __init__(self) -> None:
+        self.sources: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.vocab: List[str] = []
+        self.segments: List[_Segment] = []
+        self.source_counts: Dict[int, int] = {}
+        self._source_ids: Dict[str, int] = {}
+        self._meta_ids: Dict[str, int] = {}
+        self._token_ids: Dict[str, int] = {}
+        self._next_segment = 1
+        self._next_chunk_id = 1
+        self.stamp: Optional[Tuple[int, int, int]] = None
+        self._swept = False
+
+    @classmethod
+    def load(cls) -> "_Store":
+        store = cls()
+        if not os.path.exists(TABLES_PATH):
+            return store
+        with open(TABLES_PATH, "r", encoding="utf-8") as f:
+            tables = json.load(f)
+        for src in tables.get("sources", []):
+            store.intern_source(src)
+        for meta in tables.get("metadata", []):
+            store.intern_metadata(meta)
+        for tok in tables.get("vocab", []):
+            store.intern_token(tok)
+        store._next_segment = tables.get("next_segment", 1)
+        store._next_chunk_id = tables.get("next_chunk_id", 1)
+        tombstones = tables.get("tombstones", {})
+        for name in tables.get("segments", []):
+            seg = _Segment(name, os.path.join(KB_DIR, name), tombstones.get(name, ()))
+            store.segments.append(seg)
+            store._count_rows(seg, 1)
+        store.stamp = _tables_stamp()
+        return store
+
+    def sweep_orphans(self) -> None:
+        """Remove segment files the tables don't reference.
+
+        Must run under the writer lock: every segment is written while holding
+        it, so any unreferenced file is left over from an interrupted write.
+        """
+        live = {seg.name for seg in self.segments}
+        for fname in os.listdir(KB_DIR):
+            if _SEGMENT_NAME_RE.match(fname) and fname not in live:
+                _remove_quietly(os.path.join(KB_DIR, fname))
+
+    def close(self) -> None:
+        for seg in self.segments:
+            seg.close()
+        self.segments = []
+
+    def intern_source(self, source: str) -> int:
+        sid = self._source_ids.get(source)
+        if sid is None:
+            sid = self._source_ids[source] = len(self.sources)
+            self.sources.append(source)
+        return sid
+
+    def intern_metadata(self, meta: Dict[str, Any]) -> int:
+        key = _meta_key(meta)
+        mid = self._meta_ids.get(key)
+        if mid is None:
+            mid = self._meta_ids[key] = len(self.metadata)
+            self.metadata.append(meta)
+        return mid
+
+    def intern_token(self, token: str) -> int:
+        tid = self._token_ids.get(token)
+        if tid is None:
+            tid = self._token_ids[token] = len(self.vocab)
+            self.vocab.append(token)
+        return tid
+
+    def reset_tables(self, sources: List[str], metadata: List[Dict[str, Any]], vocab: List[str]) -> None:
+        self.sources, self.metadata, self.vocab = [], [], []
+        self._source_ids, self._meta_ids, self._token_ids = {}, {}, {}
+        for src in sources:
+            self.intern_source(src)
+        for meta in metadata:
+            self.intern_metadata(meta)
+        for tok in vocab:
+            self.intern_token(tok)
+
+    def lookup_tokens(self, tokens: List[str]) -> set:
+        return {self._token_ids[t] for t in tokens if t in self._token_ids}
+
+    def _count_rows(self, seg: _Segment, delta: int) -> None:
+        """Add ``delta`` times each source's live row count in ``seg`` to ``source_counts``."""
+        for sid, rows in seg.source_rows.items():
+            live = len(rows) - sum(1 for r in rows if r in seg.dead) if seg.dead else len(rows)
+            self.source_counts[sid] = self.source_counts.get(sid, 0) + delta * live
+
+    def _allocate_segment(self) -> Tuple[str, str]:
+        name = f"seg-{self._next_segment:06d}.bin"
+        self._next_segment += 1
+        return name, os.path.join(KB_DIR, name)
+
+    def append(self, docs: List[Dict[str, Any]], replace_sources: Iterable[str] = ()) -> int:
+        """Write ``docs`` as a new segment, tombstoning live chunks of ``replace_sources``."""
+        rows = []
+        for d in docs:
+            text = d.get("text", "")
+            meta = d.get("metadata", {}) or {}
+            source_id = self.intern_source(str(meta.get("source_document") or "unknown"))
+            toks = array(_U32, sorted({self.intern_token(t) for t in _tokenize(text)}))
+            rows.append((self._next_chunk_id, source_id, self.intern_metadata(meta), text.encode("utf-8"), toks))
+            self._next_chunk_id += 1
+        doomed = [d for source in replace_sources for d in self._live_rows(source)]
+        new_seg = None
+        if rows:
+            # Write the new version before touching the old one, so a failed
+            # write leaves the previous version live.
+            name, path = self._allocate_segment()
+            _Segment.write(path, rows)
+            new_seg = _Segment(name, path)
+        if new_seg is not None or doomed:
+            self._commit(new_seg, doomed)
+        return len(rows)
+
+    def delete_source(self, source: str) -> int:
+        doomed = self._live_rows(source)
+        if doomed:
+            self._commit(None, doomed)
+        return sum(len(rows) for _, _, rows in doomed)
+
+    def _live_rows(self, source: str) -> List[Tuple[int, _Segment, List[int]]]:
+        """(source_id, segment, rows) for every live chunk of ``source``."""
+        sid = self._source_ids.get(source)
+        if sid is None or not self.source_counts.get(sid):
+            return []
+        found = []
+        for seg in self.segments:
+            rows = [r for r in seg.source_rows.get(sid, ()) if r not in seg.dead]
+            if rows:
+                found.append((sid, seg, rows))
+        return found
+
+    def _commit(self, new_seg: Optional[_Segment], doomed: List[Tuple[int, _Segment, List[int]]]) -> None:
+        """Tombstone ``doomed``, add ``new_seg`` and save; rolled back if the save fails."""
+        for sid, seg, rows in doomed:
+            seg.dead.update(rows)
+            self.source_counts[sid] -= len(rows)
+        if new_seg is not None:
+            self.segments.append(new_seg)
+            self._count_rows(new_seg, 1)
+        try:
+            self._save_tables()
+        except BaseException:
+            for sid, seg, rows in doomed:
+                seg.dead.difference_update(rows)
+                self.source_counts[sid] += len(rows)
+            if new_seg is not None:
+                self.segments.remove(new_seg)
+                self._count_rows(new_seg, -1)
+                new_seg.close()
+                _remove_quietly(new_seg.path)
+            raise
+
+    def needs_compaction(self) -> bool:
+        if not self.segments:
+            return False
+        total = sum(seg.size for seg in self.segments)
+        dead = sum(len(seg.dead) for seg in self.segments)
+        return len(self.segments) > COMPACT_MAX_SEGMENTS or dead > total * COMPACT_DEAD_RATIO
+
+    def _save_tables(self) -> None:
+        tables = {
+            "sources": self.sources,
+            "metadata": self.metadata,
+            "vocab": self.vocab,
+            "segments": [seg.name for seg in self.segments],
+            "tombstones": {seg.name: sorted(seg.dead) for seg in self.segments if seg.dead},
+            "next_segment": self._next_segment,
+            "next_chunk_id": self._next_chunk_id,
+        }
+        tmp = TABLES_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tables, f, ensure_ascii=False)
+        os.replace(tmp, TABLES_PATH)
+        self.stamp = _tables_stamp()
+        _bump_generation()
+
+
+_store: Optional[_Store] = None
+
+
+def _bump_generation() -> None:
+    global _generation
+    _generation += 1
+
+
+def _get_store() -> _Store:
+    """Return the in-process store, reloading if another process rewrote the tables."""
+    global _store
+    with _lock:
+        if _store is not None and _tables_stamp() != _store.stamp:
+            # Not closed explicitly: an in-flight compaction may still be
+            # reading these segments; the mappings are released on GC.
+            _store = None
+        if _store is None:
+            _store = _Store.load()
+            _bump_generation()
+        return _store
+
+
+@contextmanager
+def _writing() -> Iterator[_Store]:
+    """Hold the writer lock and ``_lock``, yielding the up-to-date store."""
+    with _writer_lock, _lock:
+        store = _get_store()
+        if not store._swept:
+            store.sweep_orphans()
+            store._swept = True
+        yield store
+
+
+def _migrate_legacy_store() -> None:
+    """Import a pre-segment ``kb_store.json`` once, before the first access."""
+    if os.path.exists(TABLES_PATH) or not os.path.exists(LEGACY_STORE_PATH):
+        return
+    with _writing() as store:
+        if os.path.exists(TABLES_PATH):
+            return
+        try:
+            with open(LEGACY_STORE_PATH, "r", encoding="utf-8") as f:
+                docs = json.load(f).get("docs", [])
+        except Exception:
+            docs = []
+        if not store.append(docs):
+            store._save_tables()
+
+
+def _compact() -> None:
+    """Merge all segments into one, dropping tombstoned rows.
+
+    The interned source, metadata and vocabulary tables are rebuilt from the
+    surviving rows, so entries only used by deleted versions are dropped. Holds the writer lock throughout, so no other writer can change the store,
+    but only takes ``_lock`` around the snapshot and swap so queries keep
+    running while the merged segment is written.
+    """
+    with _writer_lock:
+        with _lock:
+            store = _get_store()
+            if not store.needs_compaction():
+                return
+            snapshot = list(store.segments)
+            name, path = store._allocate_segment()
+        # Other writers are excluded, so the old tables can be read without _lock.
+        sources: List[str] = []
+        metadata: List[Dict[str, Any]] = []
+        vocab: List[str] = []
+        source_map: Dict[int, int] = {}
+        meta_map: Dict[int, int] = {}
+        token_map: Dict[int, int] = {}
+
+        def remap(mapping: Dict[int, int], new_table: List, old_table: List, old_id: int) -> int:
+            new_id = mapping.get(old_id)
+            if new_id is None:
+                new_id = mapping[old_id] = len(new_table)
+                new_table.append(old_table[old_id])
+            return new_id
+
+        rows = []
+        for seg in snapshot:
+            for row in range(seg.size):
+                if row in seg.dead:
+                    continue
+                toks = array(_U32, sorted(remap(token_map, vocab, store.vocab, t) for t in seg.tokens(row)))
+                rows.append(
+                    (
+                        seg.chunk_ids[row],
+                        remap(source_map, sources, store.sources, seg.source_ids[row]),
+                        remap(meta_map, metadata, store.metadata, seg.meta_ids[row]),
+                        seg.text_bytes(row),
+                        toks,
+                    )
+                )
+        if rows:
+            _Segment.write(path, rows)
+        with _lock:
+            merged = _Segment(name, path) if rows else None
+            store.reset_tables(sources, metadata, vocab)
+            store.segments = [merged] if merged else []
+            store.source_counts = {}
+            if merged:
+                store._count_rows(merged, 1)
+            store._save_tables()
+            # The new tables are already saved; anything left over is swept by the next writer.
+            for seg in snapshot:
+                try:
+                    seg.close()
+                except (BufferError, ValueError) as e:
+                    logger.warning("Could not unmap %s: %s", seg.name, e)
+                _remove_quietly(seg.path)
+
+
+def _compact_in_background(store: _Store) -> None:
+    global _compacting
+
+    def run() -> None:
+        global _compacting
+        try:
+            _compact()
+        except Exception:  # pragma: no cover
+            logger.exception("KB compaction failed")
+        finally:
+            with _lock:
+                _compacting = False
+
+    with _lock:
+        if _compacting or not store.needs_compaction():
+            return
+        _compacting = True
+    threading.Thread(target=run, name="kb-compaction", daemon=True).start()
+
+
+def kb_generation() -> int:
+    """Counter that changes whenever query results could change."""
+    _migrate_legacy_store()
+    with _lock:
+        _get_store()
+        return _generation
+
+
+def add_documents(docs: List[Dict[str, Any]], replace_sources: Iterable[str] = ()) -> int:
     """Persist documents on disk and index them for simple lexical retrieval.
 
-    Each doc is stored as {id, text, metadata}. Retrieval uses token overlap scoring.
+    Each call writes one memory-mapped segment; text, metadata and tokens are
+    interned so repeated metadata and vocabulary are stored only once. Live
+    chunks from ``replace_sources`` are tombstoned in the same update.
     """
-    store = _load_store()
-    existing = store.get("docs", [])
-    for d in docs:
-        existing.append(
-            {
-                "id": str(uuid.uuid4()),
-                "text": d.get("text", ""),
-                "metadata": d.get("metadata", {}),
-            }
-        )
-    store["docs"] = existing
-    _save_store(store)
-    return len(docs)
+    _migrate_legacy_store()
+    with _writing() as store:
+        added = store.append(docs, replace_sources=replace_sources)
+    _compact_in_background(store)
+    return added
+
+
+def delete_source(source: str) -> int:
+    """Tombstone every live chunk of ``source``; returns the number removed."""
+    _migrate_legacy_store()
+    with _writing() as store:
+        deleted = store.delete_source(source)
+    _compact_in_background(store)
+    return deleted
+
+
+def list_sources() -> Dict[str, int]:
+    """Live chunk counts keyed by source document."""
+    _migrate_legacy_store()
+    with _lock:
+        store = _get_store()
+        return {store.sources[sid]: n for sid, n in store.source_counts.items() if n > 0}
 
 
 def query(query: str, k: int = 6) -> List[Dict[str, Any]]:
@@ -57,36 +626,39 @@ def query(query: str, k: int = 6) -> List[Dict[str, Any]]:
 
     This is gonna avoid "what I don't like" dependencies (numpy, chromadb) while still providing
     deterministic, document-grounded retrieval suitable for small corpora as per the assignment.
+    Each result's ``id`` is assigned once per chunk and survives compaction.
     """
-    store = _load_store()
-    docs = store.get("docs", [])
-    if not docs:
-        return []
-
-    q_tokens = set(_tokenize(query))
-    scored = []
-    for d in docs:
-        text = d.get("text", "")
-        t_tokens = set(_tokenize(text))
-        if not t_tokens:
-            continue
-        overlap = len(q_tokens & t_tokens)
-        if overlap == 0:
-            continue
-        score = overlap / max(1, len(q_tokens))
-        scored.append((score, d))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = scored[:k]
-    results: List[Dict[str, Any]] = []
-    for score, d in top:
-        results.append(
-            {
-                "text": d.get("text", ""),
-                "metadata": d.get("metadata", {}),
-                "id": d.get("id"),
-                # distance is 1 - similarity to keep shape compatible
-                "distance": 1.0 - float(score),
-            }
-        )
-    return results
+    _migrate_legacy_store()
+    with _lock:
+        store = _get_store()
+        if not store.segments:
+            return []
+
+        q_tokens = set(_tokenize(query))
+        q_ids = store.lookup_tokens(list(q_tokens))
+        scored = []
+        for seg in store.segments:
+            overlaps: Dict[int, int] = {}
+            for t in q_ids:
+                for row in seg.postings(t):
+                    overlaps[row] = overlaps.get(row, 0) + 1
+            for row in sorted(overlaps):
+                if row in seg.dead:
+                    continue
+                score = overlaps[row] / max(1, len(q_tokens))
+                scored.append((score, seg, row))
+
+        scored.sort(key=lambda x: x[0], reverse=True)
+        top = scored[:k]
+        results: List[Dict[str, Any]] = []
+        for score, seg, row in top:
+            results.append(
+                {
+                    "text": seg.text(row),
+                    "metadata": store.metadata[seg.meta_ids[row]],
+                    "id": str(seg.chunk_ids[row]),
+                    # distance is 1 - similarity to keep shape compatible
+                    "distance": 1.0 - float(score),
+                }
+            )
+        return results
@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("bs4")
+
+from backend import parser  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "PARSE_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_markdown_sections_split_on_headings_outside_fences():
+    content = b"# Discounts\nSAVE15 is 15% off.\n```bash\n# not a heading\necho hi\n```\n## Shipping\nExpress is $10.\n"
+    records = parser.parse_records(content, "specs.md")
+    assert [meta for _, meta in records] == [
+        {"source_document": "specs.md", "type": "text", "section": "Discounts"},
+        {"source_document": "specs.md", "type": "text", "section": "Shipping"},
+    ]
+    assert "# not a heading" in records[0][0]
+
+
+def test_code_only_markdown_is_one_record():
+    records = parser.parse_records(b"```python\n# comment\nx=1\n```\n", "code.md")
+    assert records == [("```python\n# comment\nx=1\n```", {"source_document": "code.md", "type": "text"})]
+
+
+def test_pdf_records_carry_page_numbers(monkeypatch):
+    monkeypatch.setattr(parser, "fitz", object())
+    monkeypatch.setattr(parser, "_pdf_pages", lambda content: [(1, "page one"), (2, "  "), (3, "page three")])
+    records = parser.parse_records(b"%PDF-1.7 fake", "spec.pdf")
+    assert records == [
+        ("page one", {"source_document": "spec.pdf", "type": "pdf", "page": 1}),
+        ("page three", {"source_document": "spec.pdf", "type": "pdf", "page": 3}),
+    ]
+
+
+def test_unreadable_pdf_is_not_cached(monkeypatch, cache_dir):
+    def broken(content):
+        raise RuntimeError("corrupt")
+
+    monkeypatch.setattr(parser, "fitz", object())
+    monkeypatch.setattr(parser, "_pdf_pages", broken)
+    records = parser.parse_records(b"not really a pdf", "broken.pdf")
+    assert records[0][1] == {"source_document": "broken.pdf", "type": "text"}
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_cache_hit_reuses_records_under_new_filename(monkeypatch, cache_dir):
+    parser.parse_records(b"# A\nbody\n", "first.md")
+    monkeypatch.setattr(parser, "_parse", lambda content, kind: pytest.fail("parsed again"))
+    records = parser.parse_records(b"# A\nbody\n", "second.md")
+    assert records[0][1]["source_document"] == "second.md"
+    assert len(list(cache_dir.iterdir())) == 1
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from backend import vector_store as vs
+
+
+@pytest.fixture(autouse=True)
+def kb_dir(tmp_path, monkeypatch):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    monkeypatch.setattr(vs, "KB_DIR", str(kb))
+    monkeypatch.setattr(vs, "TABLES_PATH", str(kb / "tables.json"))
+    monkeypatch.setattr(vs, "LOCK_PATH", str(kb / ".lock"))
+    monkeypatch.setattr(vs, "LEGACY_STORE_PATH", str(tmp_path / "kb_store.json"))
+    monkeypatch.setattr(vs, "_store", None)
+    # Compaction is driven explicitly via vs._compact() in these tests
+    monkeypatch.setattr(vs, "COMPACT_DEAD_RATIO", float("inf"))
+    monkeypatch.setattr(vs, "COMPACT_MAX_SEGMENTS", 10**6)
+    return kb
+
+
+def _doc(text, source, **meta):
+    return {"text": text, "metadata": {"source_document": source, **meta}}
+
+
+def _reload(monkeypatch):
+    monkeypatch.setattr(vs, "_store", None)
+
+
+def _compact(monkeypatch):
+    monkeypatch.setattr(vs, "COMPACT_DEAD_RATIO", 0.0)
+    vs._compact()
+    monkeypatch.setattr(vs, "COMPACT_DEAD_RATIO", float("inf"))
+
+
+def test_round_trip_survives_reload(monkeypatch):
+    added = vs.add_documents(
+        [
+            _doc("Discount code SAVE15 gives 15% off — café", "product_specs.md", page=2),
+            _doc("Express shipping costs $10", "product_specs.md", page=3),
+        ]
+    )
+    assert added == 2
+    before = vs.query("discount code", k=5)
+    assert [r["text"] for r in before] == ["Discount code SAVE15 gives 15% off — café"]
+    assert before[0]["metadata"] == {"source_document": "product_specs.md", "page": 2}
+
+    _reload(monkeypatch)
+    assert vs.query("discount code", k=5) == before
+    assert vs.list_sources() == {"product_specs.md": 2}
+
+
+def test_replace_and_delete_counts_across_compaction_and_reload(monkeypatch, kb_dir):
+    vs.add_documents([_doc("old discount rules v1", "specs.md"), _doc("old shipping v1", "specs.md")])
+    vs.add_documents([_doc("ui colours", "ui.txt")])
+    vs.add_documents([_doc("new discount rules v2", "specs.md")], replace_sources=["specs.md"])
+    assert vs.list_sources() == {"specs.md": 1, "ui.txt": 1}
+    assert [r["text"] for r in vs.query("discount rules")] == ["new discount rules v2"]
+    ids = {r["text"]: r["id"] for r in vs.query("discount colours", k=10)}
+
+    assert vs.delete_source("ui.txt") == 1
+    assert vs.delete_source("ui.txt") == 0
+    assert vs.list_sources() == {"specs.md": 1}
+
+    _compact(monkeypatch)
+    store = vs._get_store()
+    assert len(store.segments) == 1
+    assert store.sources == ["specs.md"]
+    assert "old" not in store.vocab and "colours" not in store.vocab
+    assert sorted(p.name for p in kb_dir.glob("seg-*.bin")) == [store.segments[0].name]
+
+    _reload(monkeypatch)
+    assert vs.list_sources() == {"specs.md": 1}
+    results = vs.query("discount colours", k=10)
+    assert [(r["text"], r["id"]) for r in results] == [("new discount rules v2", ids["new discount rules v2"])]
+
+    assert vs.delete_source("specs.md") == 1
+    _compact(monkeypatch)
+    assert vs.list_sources() == {}
+    assert vs.query("discount") == []
+
+
+def test_failed_write_keeps_previous_version(monkeypatch):
+    vs.add_documents([_doc("old discount", "a.md")])
+
+    def fail(path, rows):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(vs._Segment, "write", staticmethod(fail))
+    with pytest.raises(OSError):
+        vs.add_documents([_doc("new discount", "a.md")], replace_sources=["a.md"])
+    assert vs.list_sources() == {"a.md": 1}
+    assert [r["text"] for r in vs.query("discount")] == ["old discount"]
+
+
+def test_orphan_segments_are_swept_by_next_writer(kb_dir):
+    vs.add_documents([_doc("discount", "a.md")])
+    (kb_dir / "seg-000099.bin").write_bytes(b"partial")
+    (kb_dir / "seg-000100.bin.tmp").write_bytes(b"partial")
+    vs._store = None
+    vs.add_documents([_doc("shipping", "b.md")])
+    assert not (kb_dir / "seg-000099.bin").exists()
+    assert not (kb_dir / "seg-000100.bin.tmp").exists()
+
+
+def test_legacy_store_is_imported_once(tmp_path):
+    legacy = {"docs": [{"id": "x", "text": "legacy discount", "metadata": {"source_document": "old.md"}}]}
+    (tmp_path / "kb_store.json").write_text(json.dumps(legacy), encoding="utf-8")
+    assert [r["text"] for r in vs.query("discount")] == ["legacy discount"]
+    assert vs.list_sources() == {"old.md": 1}